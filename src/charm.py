@@ -7,10 +7,13 @@
 Certificates are provided by the operator through Juju configs.
 """
 
+import functools
 import logging
 import re
+from collections import Counter
+from dataclasses import dataclass
 from itertools import chain
-from typing import Any, Literal, Optional, Protocol
+from typing import Any, Optional, Protocol
 
 from charms.tls_certificates_interface.v3.tls_certificates import (
     RequirerCSR,
@@ -30,14 +33,101 @@ RELATION_NAME_TO_TLS_REQUIRER = "certificates-downstream"
 RELATION_NAME_TO_TLS_PROVIDER = "certificates-upstream"
 
 
+@functools.lru_cache(maxsize=None)
+def _parse_csr(csr: bytes) -> x509.CertificateSigningRequest:
+    """Parse a PEM encoded CSR, reusing the result for CSRs already parsed.
+
+    The same CSRs are seen both as incoming requests and as previously allowed
+    ones, so each distinct CSR is only decoded once per hook.
+
+    Args:
+        csr (bytes): PEM encoded Certificate Signing Request
+
+    Returns:
+        CertificateSigningRequest: Parsed CSR
+
+    Raises:
+        ValueError: If the CSR could not be parsed
+    """
+    return x509.load_pem_x509_csr(csr)
+
+
+def _get_san_identifiers(
+    csr: x509.CertificateSigningRequest,
+) -> tuple[tuple[str, ...], tuple[str, ...], tuple[str, ...]]:
+    """Get the DNS names, IPs and OIDs from the Subject Alternative Names of a CSR.
+
+    CSRs without a SubjectAlternativeName extension yield empty tuples.
+
+    Args:
+        csr (CertificateSigningRequest): Parsed CSR
+
+    Returns:
+        tuple of the DNS names, IPs and OIDs, all as strings
+    """
+    try:
+        san = csr.extensions.get_extension_for_class(x509.SubjectAlternativeName).value
+    except x509.ExtensionNotFound:
+        return (), (), ()
+    return (
+        tuple(san.get_values_for_type(x509.DNSName)),
+        tuple(str(ip) for ip in san.get_values_for_type(x509.IPAddress)),
+        tuple(oid.dotted_string for oid in san.get_values_for_type(x509.RegisteredID)),
+    )
+
+
+@dataclass(frozen=True, slots=True)
+class ParsedCsr:
+    """Identifiers of a CSR, extracted once and shared by all the filters."""
+
+    csr: x509.CertificateSigningRequest
+    subjects: tuple[str, ...]
+    dns: tuple[str, ...]
+    ips: tuple[str, ...]
+    oids: tuple[str, ...]
+
+    @classmethod
+    def from_csr(cls, csr: x509.CertificateSigningRequest) -> "ParsedCsr":
+        """Extract the common names and Subject Alternative Names of a parsed CSR."""
+        dns, ips, oids = _get_san_identifiers(csr)
+        return cls(
+            csr=csr,
+            subjects=tuple(
+                cn.value
+                for cn in csr.subject.get_attributes_for_oid(NameOID.COMMON_NAME)
+                if isinstance(cn.value, str)
+            ),
+            dns=dns,
+            ips=ips,
+            oids=oids,
+        )
+
+    def identifiers(self) -> set[tuple[str, str]]:
+        """Get the identifiers covered by the CSR as (category, value) pairs.
+
+        Common names are included in every category, as they may hold a DNS name,
+        an IP or an OID.
+        """
+        return {
+            *(("DNS", dns) for dns in chain(self.dns, self.subjects)),
+            *(("IP", ip) for ip in chain(self.ips, self.subjects)),
+            *(("OID", oid) for oid in chain(self.oids, self.subjects)),
+        }
+
+
 class CsrFilter(Protocol):
     """Protocol class defining a CSR filter for applying constraints."""
 
-    def evaluate(self, csr: bytes, relation_id: int, requirer_csrs: list[RequirerCSR]) -> bool:
+    def evaluate(
+        self,
+        csr: ParsedCsr,
+        relation_id: int,
+        requirer_csrs: list[RequirerCSR],
+    ) -> bool:
         """Evaluate if the provided CSR should be allowed.
 
         Args:
-            csr (bytes): CSR to evaluate
+            csr (ParsedCsr): Parsed CSR to evaluate, with its extracted identifiers
             relation_id (int): ID of the relation sending the CSR
             requirer_csrs (list): All requirer CSRs received for comparison
 
@@ -51,10 +141,21 @@ class CsrFilter(Protocol):
 class LimitToOneRequest:
     """Filter the CSR so as to only allow a single request from any relation ID."""
 
-    def evaluate(self, csr: bytes, relation_id: int, requirer_csrs: list[RequirerCSR]) -> bool:
+    def __init__(self):
+        self._counted_requirer_csrs: Optional[list[RequirerCSR]] = None
+        self._csr_counts_by_relation_id: Counter[int] = Counter()
+
+    def evaluate(
+        self,
+        csr: ParsedCsr,
+        relation_id: int,
+        requirer_csrs: list[RequirerCSR],
+    ) -> bool:
         """Accept CSR if its the first CSR of a relation or the renewal of the existing CSR."""
-        relevant_csrs = [csr for csr in requirer_csrs if csr.relation_id == relation_id]
-        if len(relevant_csrs) > 1:
+        if requirer_csrs is not self._counted_requirer_csrs:
+            self._csr_counts_by_relation_id = Counter(rc.relation_id for rc in requirer_csrs)
+            self._counted_requirer_csrs = requirer_csrs
+        if self._csr_counts_by_relation_id[relation_id] > 1:
             logger.warning(
                 "Denied CSR for relation_id: %d. Only a single CSR is allowed for application.",
                 relation_id,
@@ -66,87 +167,115 @@ class LimitToOneRequest:
 class LimitToFirstRequester:
     """Filter the CSR as to only allow the first requester to get a specific identifier."""
 
-    DENY_MSG = "CSR denied for relation ID %d, %s '%s' already requested."
+    DENY_MSG = "CSR denied for relation ID %d, identifiers already requested: %s."
 
     def __init__(self, *, allowed_csrs: list[RequirerCSR]):
         self._allowed_csrs = allowed_csrs
-        self._registered_dns: dict[str, int | None] = {}
-        self._registered_ips: dict[str, int | None] = {}
-        self._registered_oids: dict[str, int | None] = {}
+        self._registered: dict[int | None, set[tuple[str, str]]] = {}
+        self._registered_by_others: dict[int, set[tuple[str, str]]] = {}
+        self._relation_ids_by_csr: dict[str, int] = {}
+        self._indexed_requirer_csrs: Optional[list[RequirerCSR]] = None
+        self._indexed_requirer_csrs_count = 0
+        self._indexed_allowed_csrs_count = 0
 
     def _populate_previously_allowed_identifiers(self, requirer_csrs: list[RequirerCSR]) -> None:
         """Populate the previously allowed identifiers mapping.
 
         Goes through all the allowed CSRs, finding their DNS, IP and OIDs
-        and adding them to the lookup table with the relation ID of the
-        downstream relation that requested that CSR.
+        and adding them, as (category, value) pairs, to the set of identifiers
+        of the downstream relation that requested that CSR.
+
+        Both lists of CSRs are only ever appended to while a hook runs, so the
+        lookup table is only rebuilt when given another requirer CSRs list, or
+        when either list changed length in a way appending cannot explain.
+        Otherwise, only the allowed CSRs added since the last call are indexed.
 
         Args:
             requirer_csrs: List of RequirerCSRs from the downstream relations
         Return:
             None
         """
-        csr_to_id = {rc.csr: rc.relation_id for rc in requirer_csrs}
-
-        for allowed_csr in self._allowed_csrs:
-            relation_id = csr_to_id.get(allowed_csr.csr, None)
-            csr_object = x509.load_pem_x509_csr(allowed_csr.csr.encode("utf-8"))
-            subjects = [
-                cn.value
-                for cn in csr_object.subject.get_attributes_for_oid(NameOID.COMMON_NAME)
-                if isinstance(cn.value, str)
-            ]
-            try:
-                san = csr_object.extensions.get_extension_for_class(
-                    x509.SubjectAlternativeName
-                ).value  # noqa: E501
-            except x509.ExtensionNotFound:
-                san = x509.SubjectAlternativeName([])
-            for dns in chain(san.get_values_for_type(x509.DNSName), subjects):
-                self._registered_dns[dns] = relation_id
-            for ip in chain(san.get_values_for_type(x509.IPAddress), subjects):
-                self._registered_ips[str(ip)] = relation_id
-            for oid in chain(
-                (
-                    getattr(o, "dotted_string", "")
-                    for o in san.get_values_for_type(x509.RegisteredID)
-                ),  # noqa: E501
-                subjects,
-            ):
-                self._registered_oids[oid] = relation_id
-
-    def evaluate(self, csr: bytes, relation_id: int, requirer_csrs: list[RequirerCSR]) -> bool:
+        if (
+            requirer_csrs is not self._indexed_requirer_csrs
+            or len(requirer_csrs) != self._indexed_requirer_csrs_count
+            or len(self._allowed_csrs) < self._indexed_allowed_csrs_count
+        ):
+            self._registered.clear()
+            self._registered_by_others.clear()
+            self._relation_ids_by_csr = {rc.csr: rc.relation_id for rc in requirer_csrs}
+            self._indexed_requirer_csrs = requirer_csrs
+            self._indexed_requirer_csrs_count = len(requirer_csrs)
+            self._indexed_allowed_csrs_count = 0
+
+        for allowed_csr in self._allowed_csrs[self._indexed_allowed_csrs_count :]:
+            relation_id = self._relation_ids_by_csr.get(allowed_csr.csr, None)
+            parsed_csr = ParsedCsr.from_csr(_parse_csr(allowed_csr.csr.encode("utf-8")))
+            identifiers = parsed_csr.identifiers()
+            self._registered.setdefault(relation_id, set()).update(identifiers)
+            if relation_id is not None:
+                # Identifiers the relation now holds no longer conflict with stale CSRs.
+                self._registered_by_others.pop(relation_id, None)
+            for other_relation_id, registered_by_others in self._registered_by_others.items():
+                if relation_id is None:
+                    registered_by_others.update(
+                        identifiers - self._registered.get(other_relation_id, set())
+                    )
+                else:
+                    registered_by_others.update(identifiers)
+        self._indexed_allowed_csrs_count = len(self._allowed_csrs)
+
+    def evaluate(
+        self,
+        csr: ParsedCsr,
+        relation_id: int,
+        requirer_csrs: list[RequirerCSR],
+    ) -> bool:
         """Accept the CSR if no other relation previously requested any covered identifiers.
 
         Identifiers that need to be unique are the Subject, all Subject Alternative Names,
-        all Subject Alternative IPs and all Subject Alternative OIDs.
+        all Subject Alternative IPs and all Subject Alternative OIDs. All conflicting
+        identifiers are reported once each, in a single log record.
         """
         self._populate_previously_allowed_identifiers(requirer_csrs)
-        csr_object = x509.load_pem_x509_csr(csr)
-        subjects = [
-            cn.value for cn in csr_object.subject.get_attributes_for_oid(NameOID.COMMON_NAME)
-        ]
-        try:
-            san = csr_object.extensions.get_extension_for_class(x509.SubjectAlternativeName).value
-        except x509.ExtensionNotFound:
-            san = x509.SubjectAlternativeName([])
-        for dns in chain(san.get_values_for_type(x509.DNSName), subjects):
-            if dns in self._registered_dns and self._registered_dns[dns] != relation_id:
-                logger.warning(self.DENY_MSG, relation_id, "DNS", dns)
-                return False
-        for ip in chain(san.get_values_for_type(x509.IPAddress), subjects):
-            if str(ip) in self._registered_ips and self._registered_ips[str(ip)] != relation_id:
-                logger.warning(self.DENY_MSG, relation_id, "IP", ip)
-                return False
-        for oid in chain(
-            (getattr(o, "dotted_string", "") for o in san.get_values_for_type(x509.RegisteredID)),
-            subjects,
-        ):
-            if oid in self._registered_oids and self._registered_oids[oid] != relation_id:
-                logger.warning(self.DENY_MSG, relation_id, "OID", oid)
-                return False
+        registered_by_others = self._get_identifiers_registered_by_others(relation_id)
+        conflicts: dict[str, str] = {}
+        for category, identifier in sorted(csr.identifiers() & registered_by_others):
+            conflicts.setdefault(identifier, category)
+        if conflicts:
+            logger.warning(
+                self.DENY_MSG,
+                relation_id,
+                ", ".join(
+                    f"{category} '{identifier}'" for identifier, category in conflicts.items()
+                ),
+            )
+            return False
         return True
 
+    def _get_identifiers_registered_by_others(self, relation_id: int) -> set[tuple[str, str]]:
+        """Get the identifiers allowed for any relation other than the given one.
+
+        Identifiers of stale allowed CSRs, whose relation is gone, are ignored when the
+        given relation holds them in a current allowed CSR, so its renewals go through.
+        The union is computed once per relation ID, then kept up to date as
+        allowed CSRs are indexed until the lookup table is rebuilt.
+
+        Args:
+            relation_id (int): ID of the relation sending the CSR
+        Return:
+            set of (category, value) identifiers reserved by other relations
+        """
+        if relation_id not in self._registered_by_others:
+            stale = self._registered.get(None, set()) - self._registered.get(relation_id, set())
+            self._registered_by_others[relation_id] = stale.union(
+                *(
+                    identifiers
+                    for owner, identifiers in self._registered.items()
+                    if owner not in (relation_id, None)
+                )
+            )
+        return self._registered_by_others[relation_id]
+
 
 class AllowedFields:
     """Filter the CSR so as to only allow CSRs that match the given regexes for the CSR fields."""
@@ -174,40 +303,30 @@ class AllowedFields:
             return "field validation failed"
         return ""
 
-    def _evaluate_sans(
-        self, challenge: str, san: x509.SubjectAlternativeName, type: Literal["dns", "ip", "oid"]
-    ) -> str:
+    def _evaluate_sans(self, challenge: str, dn_list: tuple[str, ...]) -> str:
         pattern = re.compile(challenge)
-        match type:
-            case "dns":
-                dn_list = san.get_values_for_type(x509.DNSName)
-            case "ip":
-                dn_list = [str(val) for val in san.get_values_for_type(x509.IPAddress)]
-            case "oid":
-                dn_list = [val.dotted_string for val in san.get_values_for_type(x509.RegisteredID)]
-
         for dn in dn_list:
             if not pattern.match(dn):
                 return "field validation failed"
         return ""
 
-    def evaluate(self, csr: bytes, relation_id: int, requirer_csrs: list[RequirerCSR]) -> bool:  # noqa: C901
+    def evaluate(  # noqa: C901
+        self,
+        csr: ParsedCsr,
+        relation_id: int,
+        requirer_csrs: list[RequirerCSR],
+    ) -> bool:
         """Accept CSR only if the given CSR passes the field regex matches."""
-        csr_object = x509.load_pem_x509_csr(csr)
-        try:
-            san = csr_object.extensions.get_extension_for_class(x509.SubjectAlternativeName).value
-        except x509.ExtensionNotFound:
-            san = x509.SubjectAlternativeName([])
-        subject = csr_object.subject
+        subject = csr.csr.subject
         errors = []
         if challenge := self.field_filters.get("allowed-dns"):
-            if err := self._evaluate_sans(challenge, san, "dns"):
+            if err := self._evaluate_sans(challenge, csr.dns):
                 errors.append(f"error with dns in san: {err}")
         if challenge := self.field_filters.get("allowed-ips"):
-            if err := self._evaluate_sans(challenge, san, "ip"):
+            if err := self._evaluate_sans(challenge, csr.ips):
                 errors.append(f"error with ip in san: {err}")
         if challenge := self.field_filters.get("allowed-oids"):
-            if err := self._evaluate_sans(challenge, san, "oid"):
+            if err := self._evaluate_sans(challenge, csr.oids):
                 errors.append(f"error with oid in san: {err}")
         if challenge := self.field_filters.get("allowed-common-name"):
             if err := self._evaluate_subject(challenge, subject, self.COMMON_NAME_OID):
@@ -233,7 +352,11 @@ class AllowedFields:
 
 
 class TLSConstraintsCharm(CharmBase):
-    """Main class to handle Juju events."""
+    """Main class to handle Juju events.
+
+    A charm instance only ever handles a single Juju event, so the relation data and
+    configuration derived values it caches cannot go stale.
+    """
 
     def __init__(self, *args: Any):
         """Set up charm integration handlers and observe Juju events."""
@@ -313,6 +436,7 @@ class TLSConstraintsCharm(CharmBase):
             csr = request.csr.encode()
             if self._is_certificate_allowed(csr, request.relation_id):
                 self.certificates_provider.request_certificate_creation(csr, request.is_ca)
+                self._record_forwarded_csr(request.csr.strip(), request.is_ca)
             else:
                 logger.warning(
                     "Certificate Request for relation ID %d was denied. Details in previous logs.",
@@ -382,12 +506,7 @@ class TLSConstraintsCharm(CharmBase):
         Returns:
             Relation ID (int) or None
         """
-        all_requirers_csrs = self.certificates_requirers.get_requirer_csrs()
-        relation_ids = {
-            requirer_csr.relation_id
-            for requirer_csr in all_requirers_csrs
-            if requirer_csr.csr == csr
-        }
+        relation_ids = self._relation_ids_by_csr.get(csr)
         if not relation_ids:
             return None
         if len(relation_ids) > 1:
@@ -396,11 +515,23 @@ class TLSConstraintsCharm(CharmBase):
                 relation_ids,
             )
             return None
-        return relation_ids.pop()
+        return next(iter(relation_ids))
+
+    @functools.cached_property
+    def _relation_ids_by_csr(self) -> dict[str, set[int]]:
+        """Downstream relation IDs indexed by the CSRs they sent."""
+        relation_ids_by_csr: dict[str, set[int]] = {}
+        for requirer_csr in self._requirer_csrs:
+            relation_ids_by_csr.setdefault(requirer_csr.csr, set()).add(requirer_csr.relation_id)
+        return relation_ids_by_csr
 
     def _is_certificate_allowed(self, csr: bytes, relation_id: int) -> bool:
         """Decide if the certificate should be allowed.
 
+        The CSR is parsed and its signature verified once, before any filter runs,
+        and the resulting object, along with the identifiers extracted from it, is
+        shared by all filters.
+
         Args:
             csr (bytes): Certificate Signing Request to validate
             relation_id (int): Relation ID that sent the CSR
@@ -408,27 +539,68 @@ class TLSConstraintsCharm(CharmBase):
         Returns:
             True if the certificate should be allowed, False otherwise
         """
-        filters = self._get_csr_filters()
-        all_requirers_csrs = self.certificates_requirers.get_requirer_csrs()
-        if not all(filter.evaluate(csr, relation_id, all_requirers_csrs) for filter in filters):
+        filters = self._csr_filters
+        if not filters:
+            return True
+        try:
+            csr_object = _parse_csr(csr)
+        except ValueError:
+            logger.warning("Denied CSR for relation_id: %d. CSR could not be parsed.", relation_id)
             return False
+        if not csr_object.is_signature_valid:
+            logger.warning(
+                "Denied CSR for relation_id: %d. CSR signature is invalid.", relation_id
+            )
+            return False
+        all_requirers_csrs = self._requirer_csrs
+        parsed_csr = ParsedCsr.from_csr(csr_object)
+        for filter in filters:
+            if not filter.evaluate(parsed_csr, relation_id, all_requirers_csrs):
+                return False
         return True
 
-    def _get_csr_filters(self) -> list[CsrFilter]:
-        """Get all CsrFilters to apply.
+    @functools.cached_property
+    def _requirer_csrs(self) -> list[RequirerCSR]:
+        """CSRs of all downstream requirers."""
+        return self.certificates_requirers.get_requirer_csrs()
 
-        The individual filters are instantiated based on the charm configuration.
+    @functools.cached_property
+    def _provider_csrs(self) -> list[RequirerCSR]:
+        """CSRs this charm already forwarded to the TLS provider."""
+        return self.certificates_provider.get_requirer_csrs()
 
-        Returns:
-            list of CsrFilters to apply
+    def _record_forwarded_csr(self, csr: str, is_ca: bool) -> None:
+        """Add a CSR forwarded to the TLS provider to the cached provider CSRs.
+
+        This mirrors the upstream databag write done by `request_certificate_creation`.
+
+        Args:
+            csr (str): Certificate Signing Request that was forwarded
+            is_ca (bool): Whether the certificate is a CA certificate
         """
-        filters = []
+        if "_provider_csrs" not in vars(self):  # not read yet, nothing to keep in sync
+            return
+        relation = self.model.get_relation(RELATION_NAME_TO_TLS_PROVIDER)
+        if not relation:
+            return
+        self._provider_csrs.append(
+            RequirerCSR(
+                relation_id=relation.id,
+                application_name=self.app.name,
+                unit_name=self.unit.name,
+                csr=csr,
+                is_ca=is_ca,
+            )
+        )
+
+    @functools.cached_property
+    def _csr_filters(self) -> list[CsrFilter]:
+        """CsrFilters to apply, instantiated based on the charm configuration."""
+        filters: list[CsrFilter] = []
         if self.config.get("limit-to-one-request", None):
             filters.append(LimitToOneRequest())
         if self.config.get("limit-to-first-requester", False):
-            filters.append(
-                LimitToFirstRequester(allowed_csrs=self.certificates_provider.get_requirer_csrs())
-            )
+            filters.append(LimitToFirstRequester(allowed_csrs=self._provider_csrs))
 
         field_filters = {}
         for challenge in (
@@ -445,7 +617,6 @@ class TLSConstraintsCharm(CharmBase):
         if len(field_filters.items()) > 0:
             filters.append(AllowedFields(field_filters))
         logger.warning("Enabled filters: %s", filters)
-
         return filters
 
 
@@ -6,8 +6,9 @@ from charms.tls_certificates_interface.v3.tls_certificates import (
     generate_csr,
     generate_private_key,
 )
+from cryptography import x509
 
-from charm import AllowedFields
+from charm import AllowedFields, ParsedCsr
 
 
 class TestAllowedFields:
@@ -34,7 +35,9 @@ class TestAllowedFields:
 
         filter = AllowedFields(rules)
         valid_csr = generate_csr(**csr_options)
-        assert filter.evaluate(valid_csr, 1, []) is True
+        assert (
+            filter.evaluate(ParsedCsr.from_csr(x509.load_pem_x509_csr(valid_csr)), 1, []) is True
+        )
 
     @pytest.mark.parametrize(
         "invalid_field,expected_log_message",
@@ -98,6 +101,9 @@ class TestAllowedFields:
         csr_options.update(invalid_field)
         invalid_csr = generate_csr(**csr_options)
 
-        assert filter.evaluate(invalid_csr, 1, []) is False
+        assert (
+            filter.evaluate(ParsedCsr.from_csr(x509.load_pem_x509_csr(invalid_csr)), 1, [])
+            is False
+        )
         logs = [(record.levelname, record.module, record.message) for record in caplog.records]
         assert ("WARNING", "charm", expected_log_message) in logs
@@ -9,11 +9,17 @@ import scenario
 from charms.tls_certificates_interface.v3.tls_certificates import (
     ProviderCertificate,
     RequirerCSR,
+    generate_csr,
+    generate_private_key,
 )
+from cryptography import x509
+from cryptography.hazmat.primitives import serialization
 
 from charm import AllowedFields, LimitToFirstRequester, LimitToOneRequest
 from tests.unit.fixtures import TLSConstraintsFixtures
 
+CSR = generate_csr(private_key=generate_private_key(), subject="certificates-requirer").decode()
+
 
 class TestCharmConfigure(TLSConstraintsFixtures):
     def test_given_certificate_request_when_configure_then_csr_is_forwarded_to_provider(  # noqa: E501
@@ -44,6 +50,34 @@ class TestCharmConfigure(TLSConstraintsFixtures):
             b"test_csr", False
         )
 
+    def test_given_no_filters_configured_when_configure_then_requirer_csrs_not_fetched(
+        self,
+    ) -> None:
+        self.mock_tls_provides_get_outstanding_certificate_requests.return_value = [
+            RequirerCSR(
+                relation_id=1,
+                application_name="certificates-requirer",
+                unit_name="certificates-requirer/0",
+                csr=CSR,
+                is_ca=False,
+            )
+        ]
+        tls_relation = scenario.Relation(
+            endpoint="certificates-upstream",
+            interface="tls-certificates",
+        )
+        state_in = scenario.State(
+            relations={tls_relation},
+            config={"limit-to-first-requester": False},
+        )
+
+        self.ctx.run(self.ctx.on.update_status(), state=state_in)
+
+        self.mock_tls_provides_get_requirer_csrs.assert_not_called()
+        self.mock_tls_requires_request_certificate_creation.assert_called_once_with(
+            CSR.encode(), False
+        )
+
     def test_given_certificate_for_which_no_csr_exists_when_configure_then_revocation_is_forwarded_to_provider(  # noqa: E501
         self,
     ) -> None:
@@ -115,6 +149,46 @@ class TestCharmConfigure(TLSConstraintsFixtures):
             relation_id=1,
         )
 
+    def test_given_multiple_assigned_certificates_when_configure_then_requirer_csrs_fetched_once(  # noqa: E501
+        self,
+    ) -> None:
+        self.mock_tls_requires_get_assigned_certificates.return_value = [
+            ProviderCertificate(
+                relation_id=1,
+                application_name="certificates-provider",
+                csr=f"test_csr_{i}",
+                certificate=f"test_cert_{i}",
+                ca="test_ca",
+                chain=["test_ca", "test_intermediate"],
+                revoked=False,
+                expiry_time=datetime.datetime.now(),
+            )
+            for i in range(3)
+        ]
+        self.mock_tls_provides_get_requirer_csrs.return_value = [
+            RequirerCSR(
+                relation_id=i + 1,
+                application_name="certificates-requirer",
+                unit_name=f"certificates-requirer/{i}",
+                csr=f"test_csr_{i}",
+                is_ca=False,
+            )
+            for i in range(3)
+        ]
+        tls_relation = scenario.Relation(
+            endpoint="certificates-upstream",
+            interface="tls-certificates",
+        )
+        state_in = scenario.State(
+            relations={tls_relation},
+            config={"limit-to-first-requester": False},
+        )
+
+        self.ctx.run(self.ctx.on.update_status(), state=state_in)
+
+        self.mock_tls_provides_get_requirer_csrs.assert_called_once()
+        assert self.mock_tls_provides_set_relation_certificate.call_count == 3
+
     def test_given_limit_to_one_request_set_when_second_certificate_requested_then_certificate_not_generated(  # noqa: E501
         self,
     ) -> None:
@@ -123,7 +197,7 @@ class TestCharmConfigure(TLSConstraintsFixtures):
                 relation_id=1,
                 application_name="certificates-requirer",
                 unit_name="certificates-requirer/0",
-                csr="test_csr",
+                csr=CSR,
                 is_ca=False,
             )
         ]
@@ -132,14 +206,14 @@ class TestCharmConfigure(TLSConstraintsFixtures):
                 relation_id=1,
                 application_name="certificates-requirer",
                 unit_name="certificates-requirer/0",
-                csr="test_csr",
+                csr=CSR,
                 is_ca=False,
             ),
             RequirerCSR(
                 relation_id=1,
                 application_name="certificates-requirer",
                 unit_name="certificates-requirer/1",
-                csr="test_csr",
+                csr=CSR,
                 is_ca=False,
             ),
         ]
@@ -159,6 +233,145 @@ class TestCharmConfigure(TLSConstraintsFixtures):
 
         self.mock_tls_requires_request_certificate_creation.assert_not_called()
 
+    def test_given_multiple_certificate_requests_when_configure_then_requirer_csrs_fetched_once(  # noqa: E501
+        self,
+    ) -> None:
+        requirer_csrs = [
+            RequirerCSR(
+                relation_id=i + 1,
+                application_name="certificates-requirer",
+                unit_name=f"certificates-requirer/{i}",
+                csr=generate_csr(private_key=generate_private_key(), subject=f"app-{i}").decode(),
+                is_ca=False,
+            )
+            for i in range(2)
+        ]
+        self.mock_tls_provides_get_outstanding_certificate_requests.return_value = requirer_csrs
+        self.mock_tls_provides_get_requirer_csrs.return_value = requirer_csrs
+        tls_relation = scenario.Relation(
+            endpoint="certificates-upstream",
+            interface="tls-certificates",
+        )
+        state_in = scenario.State(
+            relations={tls_relation},
+            config={
+                "limit-to-first-requester": False,
+                "limit-to-one-request": True,
+            },
+        )
+
+        self.ctx.run(self.ctx.on.update_status(), state=state_in)
+
+        self.mock_tls_provides_get_requirer_csrs.assert_called_once()
+        assert self.mock_tls_requires_request_certificate_creation.call_count == 2
+
+    def test_given_conflicting_certificate_requests_when_configure_then_only_first_is_forwarded(  # noqa: E501
+        self,
+    ) -> None:
+        requirer_csrs = [
+            RequirerCSR(
+                relation_id=i + 1,
+                application_name=f"certificates-requirer-{i}",
+                unit_name=f"certificates-requirer-{i}/0",
+                csr=generate_csr(private_key=generate_private_key(), subject="app")
+                .decode()
+                .strip(),
+                is_ca=False,
+            )
+            for i in range(2)
+        ]
+        self.mock_tls_provides_get_outstanding_certificate_requests.return_value = requirer_csrs
+        self.mock_tls_provides_get_requirer_csrs.return_value = requirer_csrs
+        tls_relation = scenario.Relation(
+            endpoint="certificates-upstream",
+            interface="tls-certificates",
+        )
+        state_in = scenario.State(
+            relations={tls_relation},
+            config={"limit-to-first-requester": True},
+        )
+
+        self.ctx.run(self.ctx.on.update_status(), state=state_in)
+
+        self.mock_tls_requires_request_certificate_creation.assert_called_once_with(
+            requirer_csrs[0].csr.encode(), False
+        )
+
+    def test_given_unparsable_csr_when_configure_then_certificate_not_generated(
+        self,
+        caplog: pytest.LogCaptureFixture,
+    ) -> None:
+        self.mock_tls_provides_get_outstanding_certificate_requests.return_value = [
+            RequirerCSR(
+                relation_id=1,
+                application_name="certificates-requirer",
+                unit_name="certificates-requirer/0",
+                csr="test_csr",
+                is_ca=False,
+            )
+        ]
+        tls_relation = scenario.Relation(
+            endpoint="certificates-upstream",
+            interface="tls-certificates",
+        )
+        state_in = scenario.State(
+            relations={tls_relation},
+            config={
+                "limit-to-first-requester": False,
+                "limit-to-one-request": True,
+            },
+        )
+
+        self.ctx.run(self.ctx.on.update_status(), state=state_in)
+
+        self.mock_tls_requires_request_certificate_creation.assert_not_called()
+        logs = [(record.levelname, record.module, record.message) for record in caplog.records]
+        assert (
+            "WARNING",
+            "charm",
+            "Denied CSR for relation_id: 1. CSR could not be parsed.",
+        ) in logs
+
+    def test_given_csr_with_invalid_signature_when_configure_then_certificate_not_generated(
+        self,
+        caplog: pytest.LogCaptureFixture,
+    ) -> None:
+        csr_der = bytearray(
+            x509.load_pem_x509_csr(CSR.encode()).public_bytes(serialization.Encoding.DER)
+        )
+        csr_der[-1] ^= 0xFF
+        forged_csr = x509.load_der_x509_csr(bytes(csr_der)).public_bytes(
+            serialization.Encoding.PEM
+        )
+        self.mock_tls_provides_get_outstanding_certificate_requests.return_value = [
+            RequirerCSR(
+                relation_id=1,
+                application_name="certificates-requirer",
+                unit_name="certificates-requirer/0",
+                csr=forged_csr.decode(),
+                is_ca=False,
+            )
+        ]
+        tls_relation = scenario.Relation(
+            endpoint="certificates-upstream",
+            interface="tls-certificates",
+        )
+        state_in = scenario.State(
+            relations={tls_relation},
+            config={"limit-to-first-requester": True},
+        )
+
+        self.ctx.run(self.ctx.on.update_status(), state=state_in)
+
+        self.mock_tls_requires_request_certificate_creation.assert_not_called()
+        self.mock_tls_provides_get_requirer_csrs.assert_not_called()
+        logs = [(record.levelname, record.module, record.message) for record in caplog.records]
+        assert (
+            "WARNING",
+            "charm",
+            "Denied CSR for relation_id: 1. CSR signature is invalid.",
+        ) in logs
+
     def test_given_no_requested_certificate_when_configure_then_error_is_logged(
         self,
         caplog: pytest.LogCaptureFixture,
@@ -327,8 +540,8 @@ class TestCharmConfigure(TLSConstraintsFixtures):
         )
 
         with self.ctx(self.ctx.on.update_status(), state_in) as manager:
-            assert len(manager.charm._get_csr_filters()) > 0  # type: ignore[reportAttributeAccessIssue]
-            assert isinstance(manager.charm._get_csr_filters()[0], LimitToOneRequest)  # type: ignore[reportAttributeAccessIssue]
+            assert len(manager.charm._csr_filters) > 0  # type: ignore[reportAttributeAccessIssue]
+            assert isinstance(manager.charm._csr_filters[0], LimitToOneRequest)  # type: ignore[reportAttributeAccessIssue]
 
     def test_given_limit_to_first_requirer_filter_when_configure_then_filter_available(  # noqa: E501
         self,
@@ -342,8 +555,8 @@ class TestCharmConfigure(TLSConstraintsFixtures):
             config={"limit-to-first-requester": True},
         )
         with self.ctx(self.ctx.on.update_status(), state_in) as manager:
-            assert len(manager.charm._get_csr_filters()) > 0  # type: ignore[reportAttributeAccessIssue]
-            assert isinstance(manager.charm._get_csr_filters()[0], LimitToFirstRequester)  # type: ignore[reportAttributeAccessIssue]
+            assert len(manager.charm._csr_filters) > 0  # type: ignore[reportAttributeAccessIssue]
+            assert isinstance(manager.charm._csr_filters[0], LimitToFirstRequester)  # type: ignore[reportAttributeAccessIssue]
 
     def test_given_allowlist_config_filter_when_config_set_then_filter_available(  # noqa: E501
         self,
@@ -366,5 +579,20 @@ class TestCharmConfigure(TLSConstraintsFixtures):
             },
         )
         with self.ctx(self.ctx.on.update_status(), state_in) as manager:
-            assert len(manager.charm._get_csr_filters()) > 0  # type: ignore[reportAttributeAccessIssue]
-            assert isinstance(manager.charm._get_csr_filters()[0], AllowedFields)  # type: ignore[reportAttributeAccessIssue]
+            assert len(manager.charm._csr_filters) > 0  # type: ignore[reportAttributeAccessIssue]
+            assert isinstance(manager.charm._csr_filters[0], AllowedFields)  # type: ignore[reportAttributeAccessIssue]
+
+    def test_given_filters_configured_when_csr_filters_accessed_twice_then_filters_reused(
+        self,
+    ) -> None:
+        tls_relation = scenario.Relation(
+            endpoint="certificates-upstream",
+            interface="tls-certificates",
+        )
+        state_in = scenario.State(
+            relations={tls_relation},
+            config={"limit-to-first-requester": True, "limit-to-one-request": True},
+        )
+        with self.ctx(self.ctx.on.update_status(), state_in) as manager:
+            filters = manager.charm._csr_filters  # type: ignore[reportAttributeAccessIssue]
+            assert manager.charm._csr_filters is filters  # type: ignore[reportAttributeAccessIssue]
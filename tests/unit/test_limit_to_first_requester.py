@@ -1,6 +1,7 @@
 # Copyright 2024 Canonical Ltd.
 # See LICENSE file for licensing details.
 from random import choice
+from unittest.mock import patch
 
 import pytest
 from charms.tls_certificates_interface.v3.tls_certificates import (
@@ -8,8 +9,9 @@ from charms.tls_certificates_interface.v3.tls_certificates import (
     generate_csr,
     generate_private_key,
 )
+from cryptography import x509
 
-from charm import LimitToFirstRequester
+from charm import LimitToFirstRequester, ParsedCsr
 
 MY_RELATION_ID = 1
 OTHER_RELATION_ID = 2
@@ -111,6 +113,10 @@ OLD_REQUIRER_CSR = RequirerCSR(
 )
 
 
+def parse_csr(csr: bytes) -> ParsedCsr:
+    return ParsedCsr.from_csr(x509.load_pem_x509_csr(csr))
+
+
 class TestLimitToFirstRequester:
     @pytest.mark.parametrize(
         "csr,relation_id,expected",
@@ -218,50 +224,61 @@ class TestLimitToFirstRequester:
         self, csr: bytes, relation_id: int, expected: bool
     ):
         filter = LimitToFirstRequester(allowed_csrs=ALLOWED_CSRS)
-        assert filter.evaluate(csr, relation_id, REQUIRER_CSRS) is expected
+        assert filter.evaluate(parse_csr(csr), relation_id, REQUIRER_CSRS) is expected
 
     @pytest.mark.parametrize(
         "csr,expected",
         [
             pytest.param(
                 generate_csr(private_key=PRIVATE_KEY, subject=RESERVED_SUBJECTS[0]),
-                f"CSR denied for relation ID {MY_RELATION_ID}, "
-                + f"DNS '{RESERVED_SUBJECTS[0]}' already requested.",
-                id="dns_san_previously_requested",
+                f"CSR denied for relation ID {MY_RELATION_ID}, identifiers already requested: "
+                + f"DNS '{RESERVED_SUBJECTS[0]}'.",
+                id="subject_previously_requested",
             ),
             pytest.param(
                 generate_csr(private_key=PRIVATE_KEY, subject=RESERVED_DNS[0]),
-                f"CSR denied for relation ID {MY_RELATION_ID}, "
-                + f"DNS '{RESERVED_DNS[0]}' already requested.",
+                f"CSR denied for relation ID {MY_RELATION_ID}, identifiers already requested: "
+                + f"DNS '{RESERVED_DNS[0]}'.",
                 id="dns_san_previously_requested",
             ),
             pytest.param(
                 generate_csr(private_key=PRIVATE_KEY, subject=RESERVED_IPS[0]),
-                f"CSR denied for relation ID {MY_RELATION_ID}, "
-                + f"IP '{RESERVED_IPS[0]}' already requested.",
+                f"CSR denied for relation ID {MY_RELATION_ID}, identifiers already requested: "
+                + f"IP '{RESERVED_IPS[0]}'.",
                 id="ip_subject_previously_requested",
             ),
             pytest.param(
                 generate_csr(private_key=PRIVATE_KEY, subject=RESERVED_OIDS[0]),
-                f"CSR denied for relation ID {MY_RELATION_ID}, "
-                + f"OID '{RESERVED_OIDS[0]}' already requested.",
+                f"CSR denied for relation ID {MY_RELATION_ID}, identifiers already requested: "
+                + f"OID '{RESERVED_OIDS[0]}'.",
                 id="oid_san_previously_requested",
             ),
+            pytest.param(
+                generate_csr(
+                    private_key=PRIVATE_KEY,
+                    subject=REQUESTED_SUBJECT,
+                    sans_dns=[RESERVED_DNS[1]],
+                    sans_ip=[RESERVED_IPS[1]],
+                ),
+                f"CSR denied for relation ID {MY_RELATION_ID}, identifiers already requested: "
+                + f"DNS '{RESERVED_DNS[1]}', IP '{RESERVED_IPS[1]}'.",
+                id="multiple_sans_previously_requested",
+            ),
         ],
     )
     def test_given_previous_requesters_when_evaluate_csr_then_denials_are_logged(
         self, csr: bytes, expected: str, caplog: pytest.LogCaptureFixture
     ):
         filter = LimitToFirstRequester(allowed_csrs=ALLOWED_CSRS)
-        filter.evaluate(csr, MY_RELATION_ID, REQUIRER_CSRS)
+        filter.evaluate(parse_csr(csr), MY_RELATION_ID, REQUIRER_CSRS)
         logs = [(record.levelname, record.module, record.message) for record in caplog.records]
-        assert ("WARNING", "charm", expected) in logs
+        assert logs == [("WARNING", "charm", expected)]
 
     def test_given_previous_requesters_when_evaluate_csr_then_approvals_are_not_logged(
         self, caplog: pytest.LogCaptureFixture
     ):
         filter = LimitToFirstRequester(allowed_csrs=[])
-        filter.evaluate(CSR, MY_RELATION_ID, [])
+        filter.evaluate(parse_csr(CSR), MY_RELATION_ID, [])
         logs = [(record.levelname, record.module, record.message) for record in caplog.records]
         assert len(logs) == 0
 
@@ -274,4 +291,98 @@ class TestLimitToFirstRequester:
             country_name="CA",
         )
         filter = LimitToFirstRequester(allowed_csrs=[])
-        assert filter.evaluate(csr, MY_RELATION_ID, []) is True
+        assert filter.evaluate(parse_csr(csr), MY_RELATION_ID, []) is True
+
+    def test_given_same_requirer_csrs_when_evaluate_multiple_csrs_then_allowed_csrs_indexed_once(
+        self,
+    ):
+        csr = parse_csr(CSR)
+        old_csr = parse_csr(OLD_CSR)
+        filter = LimitToFirstRequester(allowed_csrs=ALLOWED_CSRS)
+        with patch.object(ParsedCsr, "from_csr", wraps=ParsedCsr.from_csr) as from_csr:
+            filter.evaluate(csr, MY_RELATION_ID, REQUIRER_CSRS)
+            filter.evaluate(old_csr, MY_RELATION_ID, REQUIRER_CSRS)
+        assert from_csr.call_count == len(ALLOWED_CSRS)
+
+    def test_given_csr_appended_to_allowed_csrs_when_evaluate_then_only_new_csr_indexed(
+        self,
+    ):
+        allowed_csrs = list(ALLOWED_CSRS)
+        csr = parse_csr(CSR)
+        filter = LimitToFirstRequester(allowed_csrs=allowed_csrs)
+        assert filter.evaluate(csr, MY_RELATION_ID, REQUIRER_CSRS) is True
+        allowed_csrs.append(
+            RequirerCSR(
+                relation_id=PROVIDER_RELATION_ID,
+                application_name="other_app",
+                unit_name="other_app/0",
+                csr=generate_csr(
+                    private_key=PRIVATE_KEY, subject="New", sans_dns=[REQUESTED_DNS[0]]
+                ).decode("utf-8"),
+                is_ca=False,
+            )
+        )
+        with patch.object(ParsedCsr, "from_csr", wraps=ParsedCsr.from_csr) as from_csr:
+            assert filter.evaluate(csr, MY_RELATION_ID, REQUIRER_CSRS) is False
+        assert from_csr.call_count == 1
+
+    def test_given_new_requirer_csrs_when_evaluate_then_previously_allowed_identifiers_rebuilt(
+        self,
+    ):
+        filter = LimitToFirstRequester(allowed_csrs=ALLOWED_CSRS)
+        csr = parse_csr(generate_csr(private_key=PRIVATE_KEY, subject=RESERVED_SUBJECTS[0]))
+        assert filter.evaluate(csr, OTHER_RELATION_ID, REQUIRER_CSRS) is True
+        assert filter.evaluate(csr, OTHER_RELATION_ID, []) is False
+
+    def test_given_csr_when_parsed_then_common_names_and_sans_extracted_as_strings(self):
+        csr = parse_csr(CSR)
+        assert csr.subjects == (REQUESTED_SUBJECT,)
+        assert set(csr.dns) == set(REQUESTED_DNS)
+        assert set(csr.ips) == set(REQUESTED_IPS)
+        assert set(csr.oids) == set(REQUESTED_OIDS)
+
+    def test_given_identifier_allowed_for_several_relations_when_evaluate_then_csr_is_denied(
+        self,
+    ):
+        shared_csrs = [
+            RequirerCSR(
+                relation_id=relation_id,
+                application_name=f"app-{relation_id}",
+                unit_name=f"app-{relation_id}/0",
+                csr=generate_csr(
+                    private_key=generate_private_key(),
+                    subject=REQUESTED_SUBJECT,
+                    sans_dns=[RESERVED_DNS[0]],
+                ).decode("utf-8"),
+                is_ca=False,
+            )
+            for relation_id in (MY_RELATION_ID, OTHER_RELATION_ID)
+        ]
+        csr = parse_csr(
+            generate_csr(
+                private_key=PRIVATE_KEY, subject=REQUESTED_SUBJECT, sans_dns=[RESERVED_DNS[0]]
+            )
+        )
+        filter = LimitToFirstRequester(allowed_csrs=shared_csrs)
+        assert filter.evaluate(csr, MY_RELATION_ID, shared_csrs) is False
+        assert filter.evaluate(csr, OTHER_RELATION_ID, shared_csrs) is False
+
+    def test_given_stale_allowed_csr_with_identifier_held_by_relation_when_evaluate_then_csr_is_allowed(  # noqa: E501
+        self,
+    ):
+        stale_csr = generate_csr(
+            private_key=generate_private_key(), subject=REQUESTED_SUBJECT, sans_dns=REQUESTED_DNS
+        )
+        allowed_csrs = [
+            RequirerCSR(
+                relation_id=PROVIDER_RELATION_ID,
+                application_name="other_app",
+                unit_name="other_app/0",
+                csr=csr.decode("utf-8"),
+                is_ca=False,
+            )
+            for csr in (stale_csr, OLD_CSR)
+        ]
+        filter = LimitToFirstRequester(allowed_csrs=allowed_csrs)
+        assert filter.evaluate(parse_csr(CSR), MY_RELATION_ID, [OLD_REQUIRER_CSR]) is True
+        assert filter.evaluate(parse_csr(CSR), OTHER_RELATION_ID, [OLD_REQUIRER_CSR]) is False
@@ -3,9 +3,18 @@
 
 from charms.tls_certificates_interface.v3.tls_certificates import (
     RequirerCSR,
+    generate_csr,
+    generate_private_key,
 )
+from cryptography import x509
 
-from charm import LimitToOneRequest
+from charm import LimitToOneRequest, ParsedCsr
+
+CSR = ParsedCsr.from_csr(
+    x509.load_pem_x509_csr(
+        generate_csr(private_key=generate_private_key(), subject="certificates-requirer")
+    )
+)
 
 
 class TestLimitToOneRequest:
@@ -29,7 +38,7 @@ class TestLimitToOneRequest:
             ),
         ]
         filter = LimitToOneRequest()
-        assert filter.evaluate(b"", 1, requirer_csrs) is True
+        assert filter.evaluate(CSR, 1, requirer_csrs) is True
 
     def test_given_limit_to_one_filter_when_given_two_csr_then_filtered(
         self,
@@ -51,4 +60,18 @@ class TestLimitToOneRequest:
             ),
         ]
         filter = LimitToOneRequest()
-        assert filter.evaluate(b"", 1, requirer_csrs) is False
+        assert filter.evaluate(CSR, 1, requirer_csrs) is False
+
+    def test_given_limit_to_one_filter_when_given_new_requirer_csrs_then_csrs_counted_again(
+        self,
+    ) -> None:
+        requirer_csr = RequirerCSR(
+            relation_id=1,
+            application_name="certificates-requirer",
+            unit_name="certificates-requirer/0",
+            csr="test_csr",
+            is_ca=False,
+        )
+        filter = LimitToOneRequest()
+        assert filter.evaluate(CSR, 1, [requirer_csr]) is True
+        assert filter.evaluate(CSR, 1, [requirer_csr, requirer_csr]) is False